@@ -3,233 +3,290 @@
 """NTU DUMB Bird, implemented using Pygame."""
 
 import os
-from random import randint, randrange, sample
+import sys
+from random import randrange
+from itertools import permutations
 from collections import deque
-import numpy as np
 import pygame
 from pygame.locals import *
 
 #Setting
 FPS = 60
+MSEC_PER_FRAME = 1000.0 / FPS  # game time per frame; motion stays tied to the starting FPS
 ANIMATION_SPEED = 0.6  # pixels per millisecond
 WIN_WIDTH = 568    # BG image size: 284x512 px; tiled twice
 WIN_HEIGHT = 512
-
-
-class Bird(pygame.sprite.Sprite):
+SPAWN_X = float(WIN_WIDTH - 1)  # x of a newly spawned Obstacle_bonus
+_SLOTS = (0, 1, 2)              # the three lanes an object can spawn in
+NO_PIECE_Y = float('inf')       # y of the placeholder that pads Obstacle_bonus.atr_y to two entries
+BONUS, OBSTACLE, NO_PIECE = 0, 1, 2   # piece kinds in Obstacle_bonus.atr_type
+PIECE_IMAGES = ('bonus', 'obstacle')  # image/mask name of each drawable kind
+SCORE_FILE = 'score.txt'
+_scores = {'last': 0, 'high': 0}  # loaded once from SCORE_FILE, written back after each game
+_assets = {}                      # images, fonts and fixed texts, loaded once for the whole program
+_score_cache = {}                 # score -> (rendered score text, its centred x), kept across games
+SCORE_CACHE_SIZE = 256            # scores rendered after the cache is full are not kept
+NAVYBLUE = (100, 150, 255)
+SKY_COLOR = (249, 249, 249)        # sky colour at the edges of the background tiles
+EVENT_TYPES = [QUIT, KEYUP, KEYDOWN]  # the only events the game reacts to
+
+
+class Bird(object):
+    # plain class with __slots__: attributes live in fixed slots instead of a per-instance dict
+    __slots__ = ('x', 'y', 'target_y', 'msec_to_move', '_img_wingup', '_img_wingdown',
+                 '_mask_wingup', '_mask_wingdown', 'image', 'mask', '_rect', 'x_right')
 
     WIDTH = HEIGHT = 32 #The width and height of the bird's image.
-    MOVE_SPEED = 0.8 #With which speed, in pixels per millisecond
     MOVE_DURATION = 100 #The number of milliseconds it takes the bird to execute a complete Move.
 
-    def __init__(self, x, y, msec_to_move, images):
+    def __init__(self, x, y, images):
 
-        super(Bird, self).__init__()
         self.x, self.y = x, y
-        self.msec_to_move = msec_to_move
-        self.msec_to_sink = 0
+        self.target_y = y
+        self.msec_to_move = 0
         self._img_wingup, self._img_wingdown = images
         self._mask_wingup = pygame.mask.from_surface(self._img_wingup)
         self._mask_wingdown = pygame.mask.from_surface(self._img_wingdown)
+        self.image, self.mask = self._img_wingdown, self._mask_wingdown
+        self._rect = Rect(x, y, Bird.WIDTH, Bird.HEIGHT)
+        self.x_right = x + max(img.get_width() for img in images)  # x never changes; the images are wider than WIDTH
+
+    def tick_wing(self, ticks):
+        #Pick the wing image and mask once per frame from pygame.time.get_ticks().
+        if (ticks // 250) & 1:
+            self.image, self.mask = self._img_wingup, self._mask_wingup
+        else:
+            self.image, self.mask = self._img_wingdown, self._mask_wingdown
 
-    def update(self, delta_frames=1):
+    def move_to(self, y):
+        #Start moving to y; the bird gets there in MOVE_DURATION milliseconds.
+        self.target_y = y
+        self.msec_to_move = Bird.MOVE_DURATION
 
+    def update(self, dt=MSEC_PER_FRAME):
+        #Move the bird by dt milliseconds of game time, landing exactly on target_y.
         if self.msec_to_move > 0:
-            self.y -= Bird.MOVE_SPEED * frames_to_msec(delta_frames)
-            self.msec_to_move -= frames_to_msec(delta_frames)
-			
-        if self.msec_to_sink > 0:
-            self.y += Bird.MOVE_SPEED * frames_to_msec(delta_frames) 
-            self.msec_to_sink -= frames_to_msec(delta_frames)
-
-    @property
-    def image(self):
-
-        if pygame.time.get_ticks() % 500 >= 250:
-            return self._img_wingup
-        else:
-            return self._img_wingdown
-
-    @property
-    def mask(self):
-        if pygame.time.get_ticks() % 500 >= 250:
-            return self._mask_wingup
-        else:
-            return self._mask_wingdown
+            self.y += (self.target_y - self.y) * min(1.0, dt / self.msec_to_move)
+            self.msec_to_move -= dt
+            self._rect.topleft = (int(self.x), int(self.y))
 
     @property
     def rect(self):
-        return Rect(self.x, self.y, Bird.WIDTH, Bird.HEIGHT)
+        return self._rect
 
 
-class Obstacle_bonus(pygame.sprite.Sprite):
+class Obstacle_bonus(object):
+    __slots__ = ('x', 'x_right', 'score_counted', 'mul_obstacle', 'image', 'bottom_pieces', '_rect', 'atr_type', 'atr_y', 'mask', 'img_y')
 
     WIDTH = 100
     PIECE_HEIGHT = 32
-    global ADD_INTERVAL
-    ADD_INTERVAL = 500
+    ADD_INTERVAL = 500  # milliseconds between spawns
 
-    def __init__(self, obstacle_img, bonus_img):
+    def __init__(self, pool):
     
-        self.x = float(WIN_WIDTH - 1) # The new Obstacle_bonus will automatically be assigned an x attribute of
-        float(WIN_WIDTH - 1)
+        self.x = SPAWN_X # The new Obstacle_bonus will automatically be assigned an x attribute of SPAWN_X
+        self.x_right = SPAWN_X + Obstacle_bonus.WIDTH
         self.score_counted = False
-        self.mul_obstacle = randint(1,2)
-        self.image = pygame.Surface((Obstacle_bonus.WIDTH, WIN_HEIGHT), SRCALPHA)
-        self.image.convert()   		  # speeds up blitting
-        self.image.fill((0, 0, 0, 0))
         self.bottom_pieces = 1
 
-        #  Add obstacle
-        atr_lst = []
-        a = sample(range(0, 3),2)								
-        y = [i * 87 + 40 for i in a]							#固定物件生成位置在三條路上
-        for i in range(self.mul_obstacle):                          #隨機決定要生成1或2個物件
-            is_bonus = True if randrange(2) % 3 == 0 else False #隨機決定是Bonus還是Obstacle
-            if i == 0:
-                piece_pos = (0, WIN_HEIGHT - Obstacle_bonus.PIECE_HEIGHT - y[i])
-                if is_bonus:
-                    self.image.blit(bonus_img, piece_pos)
-                    atr_lst = [["bonus",piece_pos[1]]]
-                else:
-                    self.image.blit(obstacle_img, piece_pos)
-                    atr_lst = [["obstacle",piece_pos[1]]]
-            if i == 1:
-                piece_pos = (0, WIN_HEIGHT - Obstacle_bonus.PIECE_HEIGHT - y[i])
-                if is_bonus:
-                    self.image.blit(bonus_img, piece_pos)
-                    atr_lst.append(["bonus",piece_pos[1]])
-                else:
-                    self.image.blit(obstacle_img, piece_pos)
-                    atr_lst.append(["obstacle",piece_pos[1]])
-        self.atr = atr_lst
-        
-        # for collision detection
-        self.mask = pygame.mask.from_surface(self.image)
-
-    @property
-    def visible(self):
-        #Get whether this Obstacle_bonus on screen, visible to the player."""
-        return -Obstacle_bonus.WIDTH < self.x < WIN_WIDTH
+        #  Add obstacle: every outcome is prebuilt in the pool, so spawning is one random pick
+        self.mul_obstacle, atr_type, self.atr_y, self.image, self.mask, self.img_y = pool[randrange(len(pool))]
+        self._rect = Rect(self.x, self.img_y, Obstacle_bonus.WIDTH, self.image.get_height())   # same size as image and mask
+        self.atr_type = list(atr_type)    #每個物件要有自己的atr_type，吃掉bonus時會改成NO_PIECE
 
     @property
     def rect(self):
         #Get the Rect which contains this Obstacle_bonus."""
-        return Rect(self.x, 0, Obstacle_bonus.WIDTH, Obstacle_bonus.PIECE_HEIGHT)
+        return self._rect
 
-    def update(self, delta_frames=1):
-        #Update the Obstacle_bonus's position.
-        self.x -= ANIMATION_SPEED * frames_to_msec(delta_frames)
+    def update(self, dx):
+        #Move the Obstacle_bonus dx pixels to the left; dx is the same for every object in a frame.
+        self.x -= dx
+        self.x_right = self.x + Obstacle_bonus.WIDTH
+        self._rect.x = int(self.x)
 
     def collides_with(self, bird):
         #Get whether the bird collides with Obstacle_bonus.
-        return pygame.sprite.collide_mask(self, bird)
+        # cheap horizontal reject first, using the cached right edges of both
+        if self.x > bird.x_right or self.x_right < bird.x:
+            return False
+        # same test as pygame.sprite.collide_mask, without the wrapper: offset of the bird's mask in ours
+        br = bird.rect
+        return self.mask.overlap(bird.mask, (br.x - self._rect.x, br.y - self._rect.y)) is not None
+
+LANE_Y = tuple(WIN_HEIGHT - Obstacle_bonus.PIECE_HEIGHT - (k * 87 + 40) for k in _SLOTS)  #三條路上物件的y，由下往上
+BIRD_SLOT_Y = tuple(y - 13 for y in LANE_Y)   #鳥在三條路上的y，比物件高13px(和原本中間那條路的位置一樣)
 
 def load_images():
 
-    def load_image(img_file_name):
+    def load_image(img_file_name, alpha=True):
         file_name = os.path.join('.', 'images', img_file_name)
         img = pygame.image.load(file_name)
-        img.convert()
-        return img
+        # convert()/convert_alpha() return a new Surface in the display format; opaque images skip alpha blending
+        return img.convert_alpha() if alpha else img.convert()
 
-    return {'startscr': load_image('ntudb_cover.png'),
-            'ggscr': load_image('GAMEOVER.png'),
-            'background1': load_image('ntu_background_1.png'),
-            'background2': load_image('ntu_background_2.png'),
+    return {'startscr': load_image('ntudb_cover.png', alpha=False),
+            'ggscr': load_image('GAMEOVER.png', alpha=False),
+            'background1': load_image('ntu_background_1.png'),  # partly transparent at the edges; kept alpha and
+            'background2': load_image('ntu_background_2.png'),  # blended once onto SKY_COLOR in the background strip
             'obstacle': load_image('obstacle.png'),
             'bonus': load_image('bonus.png'),
             'bird_origin': load_image('bird_origin1.png'),
-            'bird_run': load_image('bird_run.png')}
+            'bird_run': load_image('bird_run.png'),
+            'bird_origin2': load_image('bird_origin2.png'),
+            'wing_down1': load_image('wing_down1.png')}
+
+def load_fonts():
+    return {'gooddp_32': pygame.font.Font('fonts/gooddp.ttf', 32),
+            'freesans_32': pygame.font.Font('freesansbold.ttf', 32),
+            'default_32': pygame.font.SysFont(None, 32, bold=True)}
+
+def render_texts(fonts):
+    #Render the fixed lines of the welcome/game-over screens once.
+    font = fonts['gooddp_32']
+    return {'enter_play': font.render('Press Enter to play!!!', True, NAVYBLUE),
+            'enter_continue': font.render('Press Enter to Continue!!!', True, NAVYBLUE),
+            'esc_quit': font.render('Press Esc to Quit!!!', True, NAVYBLUE)}
+
+def load_piece_masks(images):
+    #Build the collision masks of the single obstacle/bonus pieces once.
+    return {'obstacle': pygame.mask.from_surface(images['obstacle']),
+            'bonus': pygame.mask.from_surface(images['bonus'])}
+
+def load_assets():
+    #Load images, masks, fonts and texts from disk only once; main() runs again for every new game.
+    if not _assets:
+        _assets['images'] = load_images()
+        _assets['obstacle_pool'] = build_obstacle_pool(_assets['images'], load_piece_masks(_assets['images']))
+        _assets['bg_strip'] = build_background_strip(_assets['images']['background1'], _assets['images']['background2'])
+        _assets['fonts'] = load_fonts()
+        _assets['texts'] = render_texts(_assets['fonts'])
+    return _assets
+
+def build_obstacle_pool(images, piece_masks):
+    #Prebuild every possible Obstacle_bonus as (mul_obstacle, atr_type, atr_y, image, mask, img_y); all entries are equally likely.
+    #The image only spans its pieces, from img_y down; it is drawn img_y px below the top of the window.
+    pool = []
+    built = {}  # the same set of pieces always gives the same picture, so image and mask are shared
+    for mul_obstacle in (1, 2):                                 #生成1或2個物件
+        for lane_ys in permutations(LANE_Y, 2):                 #6種兩條不同路的排列
+            for bonus_bits in range(4):                         #兩個物件各自是Bonus還是Obstacle，機率各1/2
+                atr = []
+                for i in range(mul_obstacle):
+                    is_bonus = not (bonus_bits >> i) & 1
+                    atr.append((BONUS if is_bonus else OBSTACLE, lane_ys[i]))   #固定物件生成位置在三條路上
+                key = tuple(sorted(atr))
+                if key not in built:
+                    img_y = min(piece_y for kind, piece_y in key)
+                    height = max(piece_y + images[PIECE_IMAGES[kind]].get_height() for kind, piece_y in key) - img_y
+                    image = pygame.Surface((Obstacle_bonus.WIDTH, height), SRCALPHA).convert_alpha()   # speeds up blitting
+                    image.fill((0, 0, 0, 0))
+                    # for collision detection: stamp the prebuilt piece masks instead of scanning the whole surface
+                    mask = pygame.mask.Mask((Obstacle_bonus.WIDTH, height))
+                    blit_batch(image, [(images[PIECE_IMAGES[kind]], (0, piece_y - img_y)) for kind, piece_y in key])
+                    for kind, piece_y in key:
+                        mask.draw(piece_masks[PIECE_IMAGES[kind]], (0, piece_y - img_y))
+                    built[key] = (image, mask, img_y)
+                if mul_obstacle == 1:
+                    atr.append((NO_PIECE, NO_PIECE_Y))          #補一個永遠不會最近的空位，讓atr固定有兩個
+                atr_type, atr_y = zip(*atr)                     #拆成種類和y兩個tuple
+                pool.append((mul_obstacle, atr_type, atr_y) + built[key])
+    return pool
+
+def load_scores():
+    #Read the last score and the highscore once. Each line is parsed on its own, so a bad line only
+    #costs that value; the score file is only created when it does not exist yet.
+    try:
+        with open(SCORE_FILE) as f:
+            lines = f.read().split('\n')
+    except IOError:
+        save_scores()
+        return
+    for key, line in zip(('last', 'high'), lines):
+        try:
+            _scores[key] = int(line.rsplit(' ', 1)[-1])    #第二行是"Highscore: 534"，取最後一個數字
+        except ValueError:
+            pass
 
-def frames_to_msec(frames, fps=FPS):
-    return 1000.0 * frames / fps
+def save_scores():
+    with open(SCORE_FILE, 'w') as f:
+        f.write('%d\nHighscore: %d' % (_scores['last'], _scores['high']))
 
-def msec_to_frames(milliseconds, fps=FPS):
-    return fps * milliseconds / 1000.0
+ADD_INTERVAL_FRAMES = int(round(Obstacle_bonus.ADD_INTERVAL / MSEC_PER_FRAME))  # 每隔幾個frame生成一次物件
 
-def welcomeScr(disp, pic):
-    NAVYBLUE = pygame.Color(100, 150, 255)
+def welcomeScr(disp, pic, assets):
     SLOWMOTION = 7
     tictoc = pygame.time.Clock()
-    SIZE_ALPHA = 64
-    MAGIC_NUMBER = 40
-    f = open('score.txt')
-    last_score = int(f.readline())
-    highscore = f.readline()
-    highscore = int(highscore[11:])
-
-    imgObj = pygame.image.load('images/bird_origin2.png')
-    fontObj = pygame.font.Font('fonts/VIDEOPHREAK.ttf', SIZE_ALPHA)
-    font2Obj = pygame.font.Font('fonts/gooddp.ttf', 32)
-    font3Obj = pygame.font.Font('freesansbold.ttf', 32)
-    enter = font2Obj.render('Press Enter to play!!!', True, NAVYBLUE)
-    score = font3Obj.render('Highscore: %d     Lastscore: %d' %(highscore, last_score), True, NAVYBLUE)
+    last_score = _scores['last']
+    highscore = _scores['high']
+
+    imgObj = assets['images']['bird_origin2']
+    enter = assets['texts']['enter_play']
+    score = assets['fonts']['freesans_32'].render('Highscore: %d     Lastscore: %d' %(highscore, last_score), True, NAVYBLUE)
     mode = 0
-    Flappy = []
-    Flappy_rec = []
  
     birdx, birdy = WIN_WIDTH / 2, WIN_HEIGHT / 8
     CHECK = 0
     BLINKER = 0
+    bird_rect = imgObj.get_rect(topleft=(birdx, birdy))
+    enter_rect = enter.get_rect(topleft=(WIN_WIDTH / 2, WIN_HEIGHT / 2 + 200))
+    disp.blit(pic, (0,0))              #背景和分數只畫一次，之後只重畫會動的地方
+    disp.blit(score, (50, 400))
+    pygame.display.update()
     while True:
-        disp.blit(pic, (0,0))
-        for event in pygame.event.get():
+        for event in pygame.event.get(EVENT_TYPES):
             if event.type == QUIT:
                 pygame.quit()
                 sys.exit()
             elif event.type == KEYUP and event.key == K_RETURN:
                 return True
 
+        dirty = [bird_rect, enter_rect]
+        disp.blit(pic, bird_rect, bird_rect)   #把上一格的鳥擦掉
+        bird_rect = imgObj.get_rect(topleft=(birdx + CHECK, birdy + CHECK))
+        disp.blit(imgObj, bird_rect)
+        dirty.append(bird_rect)
         if mode == 0:
-            disp.blit(imgObj, (birdx + CHECK, birdy + CHECK))
             CHECK += 3
             if CHECK >= 20:
                 mode = 1
         elif mode == 1:
-            disp.blit(imgObj, (birdx + CHECK, birdy + CHECK))
             CHECK -= 3
             if CHECK <= -20:
                 mode = 0
 
+        disp.blit(pic, enter_rect, enter_rect)
         if BLINKER == 0:
             BLINKER = 1
         else:
-            disp.blit(enter, (WIN_WIDTH / 2, WIN_HEIGHT / 2 + 200  ))
+            disp.blit(enter, enter_rect)
             BLINKER = 0
-        disp.blit(score, (50, 400))
         tictoc.tick(SLOWMOTION)
-        pygame.display.update()
+        pygame.display.update(dirty)
 
-def gameoverScr(disp, pic):
-    NAVYBLUE = pygame.Color(100, 150, 255)
+def gameoverScr(disp, pic, assets):
     SLOWMOTION = 7
     tictoc = pygame.time.Clock()
-    SIZE_ALPHA = 64
-    MAGIC_NUMBER = 40
-    f = open('score.txt')
-    last_score = int(f.readline())
-    highscore = f.readline()
-    highscore = int(highscore[11:])
-
-    imgObj = pygame.image.load('images/wing_down1.png')
-    fontObj = pygame.font.Font('fonts/VIDEOPHREAK.ttf', SIZE_ALPHA)
-    font2Obj = pygame.font.Font('fonts/gooddp.ttf', 32)
-    font3Obj = pygame.font.Font('freesansbold.ttf', 32)
-    enter = font2Obj.render('Press Enter to Continue!!!', True, NAVYBLUE)
-    enter2 = font2Obj.render('Press Esc to Quit!!!', True, NAVYBLUE)
-    score = font3Obj.render('Highscore: %d     Lastscore: %d' %(highscore, last_score), True, NAVYBLUE)
+    last_score = _scores['last']
+    highscore = _scores['high']
+
+    imgObj = assets['images']['wing_down1']
+    enter = assets['texts']['enter_continue']
+    enter2 = assets['texts']['esc_quit']
+    score = assets['fonts']['freesans_32'].render('Highscore: %d     Lastscore: %d' %(highscore, last_score), True, NAVYBLUE)
     mode = 0
-    Flappy = []
-    Flappy_rec = []
 
     birdx, birdy = WIN_WIDTH / 3, WIN_HEIGHT / 8
     CHECK = 0
-    BLINKER = 0
+    bird_rect = imgObj.get_rect(topleft=(birdx, birdy))
+    disp.blit(pic, (0,0))              #背景和文字只畫一次，之後只重畫鳥
+    disp.blit(enter, (WIN_WIDTH / 2, WIN_HEIGHT / 2 + 200 ))
+    disp.blit(enter2, (50, WIN_HEIGHT / 2 + 200 ))
+    disp.blit(score, (50, 400))
+    pygame.display.update()
 
     while True:
-        disp.blit(pic, (0,0))
-        for event in pygame.event.get():
+        for event in pygame.event.get(EVENT_TYPES):
             if event.type == QUIT:
                 pygame.quit()
                 sys.exit()
@@ -239,83 +296,92 @@ def gameoverScr(disp, pic):
             elif event.type == KEYDOWN and event.key == K_RETURN:
                 return True
 
+        dirty = [bird_rect]
+        disp.blit(pic, bird_rect, bird_rect)   #把上一格的鳥擦掉
+        bird_rect = imgObj.get_rect(topleft=(birdx + CHECK, birdy + CHECK))
+        disp.blit(imgObj, bird_rect)
+        dirty.append(bird_rect)
         if mode == 0:
-            disp.blit(imgObj, (birdx + CHECK, birdy + CHECK))
             CHECK += 3
             if CHECK >= 20:
                 mode = 1
         elif mode == 1:
-            disp.blit(imgObj, (birdx + CHECK, birdy + CHECK))
             CHECK -= 3
             if CHECK <= -20:
                 mode = 0
 
-        disp.blit(enter, (WIN_WIDTH / 2, WIN_HEIGHT / 2 + 200 ))
-        disp.blit(enter2, (50, WIN_HEIGHT / 2 + 200 ))
-        
-        disp.blit(score, (50, 400))
         tictoc.tick(SLOWMOTION)
-        pygame.display.update()
+        pygame.display.update(dirty)
 
-def redrawWindow(backgroundPic1, backgroundPic2, firstPicPos , secondPicPos , win): #用來架設背景，blit設定背景位置
-	win.blit(backgroundPic1 , (firstPicPos, 0))
-	win.blit(backgroundPic2 , (secondPicPos, 0))
+def blit_batch(surface, seq):
+    #Blit a sequence of (image, position) pairs in one call: fblits() on pygame-ce, blits() otherwise.
+    if hasattr(surface, 'fblits'):
+        surface.fblits(seq)
+    else:
+        surface.blits(seq, doreturn=0)
+
+def build_background_strip(backgroundPic1, backgroundPic2): #把兩張背景接成一長條，最後再接一次第一張，畫面捲到哪裡都能一次切出一整個視窗
+    # the tiles are not fully opaque (edge columns, top row, a few specks); lay them on the sky colour, not on black
+    w1 = backgroundPic1.get_width()
+    period = w1 + backgroundPic2.get_width()
+    strip = pygame.Surface((period + WIN_WIDTH, WIN_HEIGHT)).convert()
+    strip.fill(SKY_COLOR)
+    blit_batch(strip, ((backgroundPic1, (0, 0)), (backgroundPic2, (w1, 0)), (backgroundPic1, (period, 0))))
+    return strip, period
 	
 	
 def main(welcome = 0):
-    global FPS
     pygame.init()
-    try:
-        open('score.txt')
-    except IOError:
-        dummy = open('score.txt', 'w')
-        dummy.write('0\nHighscore: 0')
-        dummy.close()
+    pygame.event.set_blocked(None)                  #只讓會用到的事件進佇列
+    pygame.event.set_allowed(EVENT_TYPES)
+    pygame.key.set_repeat(0)                        #按住方向鍵不要一直送KEYDOWN
+    if welcome == 0:
+        load_scores()
 
     display_surface = pygame.display.set_mode((WIN_WIDTH, WIN_HEIGHT))
     pygame.display.set_caption('Pygame NTU DUMB Bird')
 
     clock = pygame.time.Clock()
-    score_font = pygame.font.SysFont(None, 32, bold=True)  # default font
-    images = load_images()
+    assets = load_assets()
+    images = assets['images']
+    obstacle_pool = assets['obstacle_pool']
+    score_font = assets['fonts']['default_32']  # default font
 
-    bird = Bird(30, int(WIN_HEIGHT* 3/4)-30, 2,
-                (images['bird_origin'], images['bird_run']))
+    bird = Bird(30, BIRD_SLOT_Y[1], (images['bird_origin'], images['bird_run']))
 
     objects = deque()
 
     frame_clock = 0  # this counter is only incremented if the game isn't paused
+    next_spawn_frame = 0  # frame_clock value at which the next Obstacle_bonus is added
     score = 0
+    shown_score = -1  # score currently rendered in score_surface
     position = 1
     speedPlus = 1
+    last_speedup_score = 0
+    fps = FPS                    #這一局的速度，每10分加速；用區域變數，下一局自然從頭開始
+    anim_speed = ANIMATION_SPEED
     bgSpeed = 3
-    bg1 = images['background1'] #儲存background圖片，背景用同一張圖片重複出現
-    bg2 = images['background2'] #儲存background圖片，背景用同一張圖片重複出現
-    bgX = 0					    #第一張圖片的位置為零
-    bgX2 = bg1.get_width()      #第二張圖片的位置為前一張的寬度之後
+    bg_strip, bg_period = assets['bg_strip'] #兩張background接成的長條圖，一個週期是兩張圖的寬度
+    bgX = 0.0					    #視窗左邊對到長條圖的哪個位置
 	
     done = paused = False
     if welcome == 0:
         start_screen = images['startscr'] #儲存background圖片，背景用同一張圖片重複出現
-        welcomeScr(display_surface, start_screen) #開始介面
+        welcomeScr(display_surface, start_screen, assets) #開始介面
     while not done:
-        redrawWindow(bg1, bg2, bgX, bgX2 , display_surface) #架設背景
-        clock.tick(FPS)
+        clock.tick(fps)
+        bird.tick_wing(pygame.time.get_ticks())        #每個frame只讀一次時間
 
-        bgX -= bgSpeed								  #第一張背景的位置會0 - 1.4，一直減下去，背景就會一直往左走
-        bgX2 -= bgSpeed								  #同上
-        if bgX < bg1.get_width() * -1:				  #如果第一張背景的位置跑到負的背景圖寬度，代表背景完全跑到視窗左側，把第一張背景位置重新設為右側(圖片寬度位置)
-            bgX = bg1.get_width()
-        if bgX2 < bg2.get_width() * -1:				  #同上
-            bgX2 = bg2.get_width()
+        bgX = (bgX + bgSpeed) % bg_period			  #一直往右切，背景就會一直往左走；走完兩張圖就從頭接上
 
         # Handle this 'manually'.  If we used pygame.time.set_timer(),
         # pipe addition would be messed up when paused.
-        if not (paused or frame_clock % msec_to_frames(ADD_INTERVAL)):
-            pp = Obstacle_bonus(images['obstacle'], images['bonus'])
+        if not paused and frame_clock >= next_spawn_frame:
+            pp = Obstacle_bonus(obstacle_pool)
             objects.append(pp)
+            next_spawn_frame += ADD_INTERVAL_FRAMES
 
-        for e in pygame.event.get():
+        for e in pygame.event.get(EVENT_TYPES):
             if e.type == QUIT or (e.type == KEYUP and e.key == K_ESCAPE):
                 done = True
                 break
@@ -323,67 +389,74 @@ def main(welcome = 0):
                 paused = not paused
             elif e.type == KEYDOWN and e.key == K_UP:
                 if position != 2:	
-                    bird.msec_to_move = Bird.MOVE_DURATION
                     position +=1
+                    bird.move_to(BIRD_SLOT_Y[position])
             elif e.type == KEYDOWN and e.key == K_DOWN:
                 if position != 0:
-                    bird.msec_to_sink = Bird.MOVE_DURATION
                     position -=1
+                    bird.move_to(BIRD_SLOT_Y[position])
         if paused:
             continue  # don't draw anything
 
+        # one pass over the objects: collision, scoring, moving and collecting the blits
+        draws = [(bg_strip.subsurface((int(bgX), 0, WIN_WIDTH, WIN_HEIGHT)), (0, 0))] #架設背景：從長條圖切出視窗大小的一塊
+        gone = 0
+        obstacle_dx = anim_speed * MSEC_PER_FRAME  #所有物件這個frame移動一樣的距離，只算一次
+        bx0, bx1 = bird.x, bird.x_right             #只有跟鳥水平重疊的物件才需要做碰撞偵測
         for p in objects:
-            if p.collides_with(bird) :
-                col_atr = p.atr[np.argmin([abs(bird.y - atr[1]) for atr in p.atr])][0]
-                if col_atr == "bonus":
+            if p.x <= bx1 and p.x_right >= bx0 and p.collides_with(bird) :
+                atr_type, atr_y = p.atr_type, p.atr_y
+                idx = 0 if abs(bird.y - atr_y[0]) <= abs(bird.y - atr_y[1]) else 1 #找離鳥最近的物件
+                col_atr = atr_type[idx]
+                if col_atr == BONUS:
                     score += 3
                     p.score_counted = True
-                    p.atr[np.argmin([abs(bird.y - atr[1]) for atr in p.atr])][0] = 'None' #將原本紀錄成bonus改成none，讓鬆餅碰一下只加一分
-                elif col_atr == "None":													  #所以遇到替代bonus的None，不會做任何事
+                    atr_type[idx] = NO_PIECE #將原本紀錄成bonus改成none，讓鬆餅碰一下只加一分
+                elif col_atr == NO_PIECE:													  #所以遇到替代bonus的None，不會做任何事
                     pass
                 else:
                     done = True
-            if p.x + Obstacle_bonus.WIDTH < bird.x and not p.score_counted:
+            if p.x_right < bird.x and not p.score_counted:
                 score += 1
                 p.score_counted = True		
-        if score % 10 == 1 :    	 #每得到10分，會加速一點
-            global ANIMATION_SPEED
-            ANIMATION_SPEED += 0.001 #每10分，障礙物速度加0.001
-            FPS += 10
-            bgSpeed += 0.05			 #每10分，背景速度增加1
-
-        while objects and not objects[0].visible:
+            p.update(obstacle_dx)
+            if p.x <= -Obstacle_bonus.WIDTH:  # objects are FIFO, so the ones off the left edge are all at the front
+                gone += 1
+            else:
+                draws.append((p.image, (p.x, p.img_y)))
+        for _ in range(gone):
             objects.popleft()
 
-        for p in objects:
-            p.update()
-            display_surface.blit(p.image, p.rect)
-
-        bird.update()
-        display_surface.blit(bird.image, bird.rect)
-
-        score_surface = score_font.render(str(score), True, (0, 0, 0))
-        score_x = WIN_WIDTH/2 - score_surface.get_width()/2
-        display_surface.blit(score_surface, (score_x, Obstacle_bonus.PIECE_HEIGHT))
+        bird.update(MSEC_PER_FRAME)
+
+        if score != shown_score:                      #分數有變才換圖，render過的分數直接拿來用
+            if score >= last_speedup_score + 10:    	 #每得到10分，會加速一點(只在分數變動時檢查)
+                anim_speed += 0.001 #每10分，障礙物速度加0.001
+                fps += 10
+                bgSpeed += 0.05			 #每10分，背景速度增加1
+                last_speedup_score = score - score % 10
+            cached = _score_cache.get(score)
+            if cached is None:
+                score_surface = score_font.render(str(score), True, (0, 0, 0)).convert_alpha()
+                cached = (score_surface, WIN_WIDTH/2 - score_surface.get_width()/2)
+                if len(_score_cache) < SCORE_CACHE_SIZE:
+                    _score_cache[score] = cached
+            score_surface, score_x = cached
+            shown_score = score
+
+        # one batched blit call per frame instead of one blit() per sprite
+        draws.append((bird.image, (bird.x, bird.y)))
+        draws.append((score_surface, (score_x, Obstacle_bonus.PIECE_HEIGHT)))
+        blit_batch(display_surface, draws)
 
         pygame.display.flip()
         frame_clock += 1
     print('Game over! Score: %i' % score)
-    rea = open('score.txt')
-    scorelasttime = rea.readline()
-    highscore = rea.readline()
-    highscore = int(highscore[11:])
-    wri = open('score.txt', 'w')
-    if highscore < score:
-        wri.write("%d\nHighscore: %d" %(score, score))
-    else:
-        wri.write("%d\nHighscore: %d" %(score, highscore))
-    
-    rea.close()
-    wri.close()
+    _scores['last'] = score
+    _scores['high'] = max(_scores['high'], score)
+    save_scores()
     gameover_screen = images['ggscr'] #儲存background圖片，背景用同一張圖片重複出現
-    if gameoverScr(display_surface, gameover_screen) == True:
-        ANIMATION_SPEED = 0.6
+    if gameoverScr(display_surface, gameover_screen, assets) == True:
         main(1)
 
 